@@ -1,7 +1,5 @@
 #!/usr/bin/env python3
 
-import os
-import logging
 import time
 import math
 import numpy as np
@@ -19,26 +17,26 @@ from pms5003 import PMS5003
 from pms5003 import ReadTimeoutError as pmsReadTimeoutError
 from enviroplus import gas
 
+from sample_store import (
+	SampleWriter,
+	SENSOR_NAMES,
+	SENSOR_IDS,
+	PROXIMITY_WARNING,
+	RESUMED,
+	PMS_READ_ERROR,
+	)
+
 
 class Sensors:
 	""" Sets up all specified sensors and includes all reused functions"""
 
 	def __init__(
 			self, 
-			sensor_list=[
-				"temperature",
-				"pressure",
-				"humidity",
-				"proximity",
-				"oxidized_gas",
-				"reduced_gas",
-				"nh3_gas",
-				"pm1",
-				"pm2.5",
-				"pm10",
-				],
+			sensor_list=SENSOR_NAMES, # Names and ids are defined in sample_store
+			samples: SampleWriter=None, # Where to record sensor errors
 			):
 		self.sensor_list = sensor_list
+		self.samples = samples
 		self.__ltr559 = LTR559() # Proximity sensor is always used
 		# Transfers information from sensor to RPi
 		# 	using the directory /dev/i2c-{bus}
@@ -109,7 +107,9 @@ class Sensors:
 					particle_data.pm_ug_per_m3(2.5),
 					particle_data.pm_ug_per_m3(10),]
 			except pmsReadTimeoutError:
-				logging.warning("pms5003 read error")
+				print("pms5003 read error")
+				if self.samples is not None:
+					self.samples.write(PMS_READ_ERROR, 0)
 				current_particles = None
 			return current_particles
 			
@@ -122,114 +122,99 @@ class Sensors:
 
 
 def collect_noise(min_bits_entropy: int):
-	# Basic logging information
-	extra_info = {"user": os.getlogin()}
-	
-	# Create a log file to store numbers in
-	logging.basicConfig(
-		format="%(asctime)s %(user)-8s %(message)s",
-		filename="./logs/new-noise-log.log", 
-		level=logging.INFO,
-		filemode="a",
-		)
+	# Binary file to store numbers in, written in batches off the sampling loop
+	# Convert to/from the old text logs with sample_store.py
+	# Leaving the with block (also on errors or Ctrl-C) writes out anything still queued
+	with SampleWriter("./logs/new-noise-log.bin") as samples:
 	
-	# LCD instance
-	display = ST7735(
-		port=0,
-		cs=1,
-		dc="GPIO9",
-		backlight="GPIO12",
-		rotation=270,
-		spi_speed_hz=10000000
-		)
-	display.begin() # initialize display
-	image = Image.new(
-				"RGB", 
-				(display.width, display.height),
-				color=(200, 200, 0) # Set to yellow to indicate setup
-				)
-	draw = ImageDraw.Draw(image) # Initiate draw object 
-	try:
-		sensors = Sensors(["temperature", "pressure"]) # Initialize the desired sensors
-	except Exception as e:
-		return ("Initialization Failed",)
-
-	sensor_data = {sensor: [] for sensor in sensors.sensor_list}
-	current_sensor_data = {sensor: 0 for sensor in sensors.sensor_list}
-
-	#try:
-	# Set display to green to indicate working
-	back_color = (0, 200, 25)
-	draw.rectangle((0, 0, 160, 80), back_color)
-	display.display(image)
-	# The first reading seems to be the same every time
-	current_sensor_data["temperature"] = 	sensors.get_temp(-999)
-	current_sensor_data["pressure"] = 		sensors.get_pres(-999)
-	current_sensor_data["humidity"] = 		sensors.get_humi(-999)
-	current_sensor_data["oxidized_gas"], current_sensor_data["reduced_gas"], current_sensor_data["nh3_gas"] = sensors.get_gas([-999, -999, -999])
-	current_sensor_data["pm1"], current_sensor_data["pm2.5"], current_sensor_data["pm10"] = sensors.get_gas([-999, -999, -999])
-	current_sensor_data["proximity"] = 		sensors.get_prox()
-
-	flag = False
-	current_entropy_bits = 0
-	entropy_output = ""
-	while not flag and current_entropy_bits < min_bits_entropy: # While the temperature is within reasonable range
-		# Get the current sensor data to check
-		current_sensor_data["temperature"] = 	sensors.get_temp(current_sensor_data["temperature"])
-		current_sensor_data["pressure"] = 		sensors.get_pres(current_sensor_data["pressure"])
-		current_sensor_data["humidity"] = 		sensors.get_humi(current_sensor_data["humidity"])
-		current_sensor_data["oxidized_gas"], current_sensor_data["reduced_gas"], current_sensor_data["nh3_gas"] = sensors.get_gas([current_sensor_data["oxidized_gas"], current_sensor_data["reduced_gas"], current_sensor_data["nh3_gas"]])
-		current_sensor_data["pm1"], current_sensor_data["pm2.5"], current_sensor_data["pm10"] = sensors.get_gas([current_sensor_data["pm1"], current_sensor_data["pm2.5"], current_sensor_data["pm10"]])
+		# LCD instance
+		display = ST7735(
+			port=0,
+			cs=1,
+			dc="GPIO9",
+			backlight="GPIO12",
+			rotation=270,
+			spi_speed_hz=10000000
+			)
+		display.begin() # initialize display
+		image = Image.new(
+					"RGB", 
+					(display.width, display.height),
+					color=(200, 200, 0) # Set to yellow to indicate setup
+					)
+		draw = ImageDraw.Draw(image) # Initiate draw object 
+		try:
+			sensors = Sensors(["temperature", "pressure"], samples) # Initialize the desired sensors
+		except Exception as e:
+			return ("Initialization Failed",)
+
+		sensor_data = {sensor: [] for sensor in sensors.sensor_list}
+		current_sensor_data = {sensor: 0 for sensor in sensors.sensor_list}
+
+		#try:
+		# Set display to green to indicate working
+		back_color = (0, 200, 25)
+		draw.rectangle((0, 0, 160, 80), back_color)
+		display.display(image)
+		# The first reading seems to be the same every time
+		current_sensor_data["temperature"] = 	sensors.get_temp(-999)
+		current_sensor_data["pressure"] = 		sensors.get_pres(-999)
+		current_sensor_data["humidity"] = 		sensors.get_humi(-999)
+		current_sensor_data["oxidized_gas"], current_sensor_data["reduced_gas"], current_sensor_data["nh3_gas"] = sensors.get_gas([-999, -999, -999])
+		current_sensor_data["pm1"], current_sensor_data["pm2.5"], current_sensor_data["pm10"] = sensors.get_gas([-999, -999, -999])
 		current_sensor_data["proximity"] = 		sensors.get_prox()
+
+		flag = False
+		current_entropy_bits = 0
+		entropy_output = ""
+		while not flag and current_entropy_bits < min_bits_entropy: # While the temperature is within reasonable range
+			# Get the current sensor data to check
+			current_sensor_data["temperature"] = 	sensors.get_temp(current_sensor_data["temperature"])
+			current_sensor_data["pressure"] = 		sensors.get_pres(current_sensor_data["pressure"])
+			current_sensor_data["humidity"] = 		sensors.get_humi(current_sensor_data["humidity"])
+			current_sensor_data["oxidized_gas"], current_sensor_data["reduced_gas"], current_sensor_data["nh3_gas"] = sensors.get_gas([current_sensor_data["oxidized_gas"], current_sensor_data["reduced_gas"], current_sensor_data["nh3_gas"]])
+			current_sensor_data["pm1"], current_sensor_data["pm2.5"], current_sensor_data["pm10"] = sensors.get_gas([current_sensor_data["pm1"], current_sensor_data["pm2.5"], current_sensor_data["pm10"]])
+			current_sensor_data["proximity"] = 		sensors.get_prox()
 	
-		if -10 > current_sensor_data["temperature"] > 50: # Stops running if the temperature gets too hot
-			flag = True
-		elif current_sensor_data["proximity"] > 1: # Make sure nothing gets too close to interfere with readings
-			back_color = (200, 0, 25) # Red to indicate error
-			draw.rectangle((0, 0, 160, 80), back_color)
-			display.display(image)
-			while current_sensor_data["proximity"] > 0:
-				# Warn that there is something interfering
-				prox_warning = (
-					"Something is near the sensor. "
-					f"Prox: {current_sensor_data['proximity']}. "
-					"Please remove to continue."
-					)
-				print(prox_warning)
-				# Add the warning to the log
-				logging.warning(
-					prox_warning,
-					extra=extra_info
-					)
-				# Wait 5 seconds before collecting the proximity again
-				time.sleep(5)
-				current_sensor_data["proximity"] = sensors.get_prox()
-			# Warn when restarting collecting
-			logging.warning(
-				"Resuming data collection", 
-				extra=extra_info
-				)
-			back_color = (0, 200, 25) # Green to indicate working
-			draw.rectangle((0, 0, 160, 80), back_color)
-			display.display(image)
-		else: # If there is nothing wrong
-			for sensor in sensors.sensor_list:
-				# Take use decimal places 5-20 for a random string
-				#random_num = Decimal(current_sensor_data[sensor])
-				random_num = int(str(
-					(Decimal(current_sensor_data[sensor])
-					- int(current_sensor_data[sensor]))
-					)[6:22])
-				print(random_num)
-				current_entropy_bits += sensors.get_entropy(str(random_num), 10)
-				entropy_output += str(random_num)
-				sensor_data[sensor].append(random_num)
-			logging.info(
-				random_num,
-				extra=extra_info
-				)
-		time.sleep(0) # The avg. sensor refresh is about .88 seconds
-	return "Success", entropy_output
+			if -10 > current_sensor_data["temperature"] > 50: # Stops running if the temperature gets too hot
+				flag = True
+			elif current_sensor_data["proximity"] > 1: # Make sure nothing gets too close to interfere with readings
+				back_color = (200, 0, 25) # Red to indicate error
+				draw.rectangle((0, 0, 160, 80), back_color)
+				display.display(image)
+				while current_sensor_data["proximity"] > 0:
+					# Warn that there is something interfering
+					prox_warning = (
+						"Something is near the sensor. "
+						f"Prox: {current_sensor_data['proximity']}. "
+						"Please remove to continue."
+						)
+					print(prox_warning)
+					# Add the warning to the log
+					samples.write(PROXIMITY_WARNING, current_sensor_data["proximity"])
+					# Wait 5 seconds before collecting the proximity again
+					time.sleep(5)
+					current_sensor_data["proximity"] = sensors.get_prox()
+				# Warn when restarting collecting
+				samples.write(RESUMED, 0)
+				back_color = (0, 200, 25) # Green to indicate working
+				draw.rectangle((0, 0, 160, 80), back_color)
+				display.display(image)
+			else: # If there is nothing wrong
+				for sensor in sensors.sensor_list:
+					# Take use decimal places 5-20 for a random string
+					#random_num = Decimal(current_sensor_data[sensor])
+					random_num = int(str(
+						(Decimal(current_sensor_data[sensor])
+						- int(current_sensor_data[sensor]))
+						)[6:22])
+					print(random_num)
+					current_entropy_bits += sensors.get_entropy(str(random_num), 10)
+					entropy_output += str(random_num)
+					sensor_data[sensor].append(random_num)
+					samples.write(SENSOR_IDS[sensor], random_num)
+			time.sleep(0) # The avg. sensor refresh is about .88 seconds
+		return "Success", entropy_output
 
 	""" For testing entropy of the sensors
 	except KeyboardInterrupt: # When the data collection is manually stopped
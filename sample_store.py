@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import time
+import queue
+import struct
+import threading
+import argparse
+from decimal import Decimal
+from datetime import datetime
+
+
+# Files start with a header so the record layout can change later
+MAGIC = b"NOISE"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<5sB") # magic, format version
+
+# One fixed-size record per reading: timestamp, sensor id, digits, raw value
+# digits is the width the value was written with (leading zeros), 0 for none
+RECORD = struct.Struct("<dBBq") # 18 bytes, little-endian, no padding
+
+# A sensor's id is its position here and is stored in every record.
+# Sensors uses this as its default sensor_list; only ever append to it.
+SENSOR_NAMES = (
+	"temperature",
+	"pressure",
+	"humidity",
+	"proximity",
+	"oxidized_gas",
+	"reduced_gas",
+	"nh3_gas",
+	"pm1",
+	"pm2.5",
+	"pm10",
+	)
+SENSOR_IDS = {name: sensor_id for sensor_id, name in enumerate(SENSOR_NAMES)}
+PMS_READ_ERROR = 251	# Value is unused
+RAW_FLOAT = 252			# Value holds the bits of a float64 reading (older text logs)
+UNKNOWN_SENSOR = 253	# Text logs do not record which sensor a value came from
+PROXIMITY_WARNING = 254	# Value is the proximity reading that stopped collection
+RESUMED = 255			# Value is unused
+
+TEXT_FORMAT = "{asctime} {user:<8} {message}"
+SKIPPED_SUFFIX = ".skipped" # Sidecar for text lines with no exact record form
+FLOAT_MESSAGE = re.compile(r"^-?\d+\.\d+$")
+PROXIMITY_MESSAGE = re.compile(
+	r"^Something is near the sensor\. Prox: (0|[1-9]\d*)\. Please remove to continue\.$"
+	)
+FLOAT_BITS = struct.Struct("<d")
+INT_BITS = struct.Struct("<q")
+TEXT_LINE = re.compile(
+	r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3}) (\S+)\s+(.*)$"
+	)
+
+
+class SampleWriter:
+	""" Appends binary sample records from a background thread in batches
+
+	Writes only put a packed record on a queue, so the sampling loop
+	never waits on the disk. The worker collects records until it has
+	batch_size of them or flush_interval seconds have passed since the
+	first one, then writes and flushes them all at once.
+	"""
+
+	def __init__(
+			self,
+			path: str,
+			batch_size: int=256,
+			flush_interval: float=1.0,
+			):
+		self.path = path
+		self.batch_size = batch_size
+		self.flush_interval = flush_interval
+		self.__queue = queue.SimpleQueue()
+		self.__stop = object() # Sentinel to end the worker
+		self.__error = None # Set if the worker fails, raised on the caller's thread
+		self.__file = open(path, "ab")
+		if self.__file.tell() == 0:
+			self.__file.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+		else:
+			try:
+				with open(path, "rb") as file:
+					check_header(file) # Don't append to a file in another format
+			except ValueError:
+				self.__file.close()
+				raise
+			# Drop a partial record left by an interrupted write so new
+			# records stay aligned
+			size = self.__file.tell()
+			usable = size - (size - HEADER.size) % RECORD.size
+			if usable != size:
+				self.__file.truncate(usable)
+		self.__worker = threading.Thread(target=self.__run, daemon=True)
+		self.__worker.start()
+
+	def write(self, sensor_id: int, value: int, digits: int=0, timestamp: float=None):
+		""" Queues one reading to be written
+
+		:param sensor_id:	Index into SENSOR_NAMES or an event id
+		:param value:		The raw integer reading
+		:param digits:		Width to zero-pad value back to, 0 for none
+		:param timestamp:	Seconds since the epoch, defaults to now
+		"""
+		if self.__error is not None:
+			raise self.__error
+		if timestamp is None:
+			timestamp = datetime.now().timestamp()
+		# Packing here raises struct.error for bad values before they are queued
+		self.__queue.put(RECORD.pack(timestamp, sensor_id, digits, value))
+
+	def close(self):
+		""" Writes everything still queued and closes the file"""
+		self.__queue.put(self.__stop)
+		self.__worker.join()
+		self.__file.close()
+		if self.__error is not None:
+			raise self.__error
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		if exc_type is None:
+			self.close()
+			return
+		# Don't hide the exception that is ending the with block
+		try:
+			self.close()
+		except Exception as e:
+			print(f"Sample writer failed while stopping: {e!r}")
+
+	def __run(self):
+		batch = bytearray()
+		deadline = None # When the current batch has to be written
+		stopping = False
+		try:
+			while not stopping:
+				timeout = None if deadline is None else max(0, deadline - time.monotonic())
+				try:
+					record = self.__queue.get(timeout=timeout)
+				except queue.Empty:
+					record = None # flush_interval has passed
+				if record is self.__stop:
+					stopping = True
+				elif record is not None:
+					if not batch:
+						deadline = time.monotonic() + self.flush_interval
+					batch += record
+					if len(batch) < self.batch_size * RECORD.size:
+						continue
+				if batch:
+					self.__file.write(batch)
+					self.__file.flush()
+					batch.clear()
+					deadline = None
+		except Exception as e:
+			self.__error = e
+
+
+def check_header(file):
+	""" Reads the header of a sample file and makes sure it can be read
+
+	:param file:	Binary file object positioned at the start
+	"""
+	header = file.read(HEADER.size)
+	if len(header) < HEADER.size or HEADER.unpack(header)[0] != MAGIC:
+		raise ValueError(f"{file.name} is not a noise sample file")
+	version = HEADER.unpack(header)[1]
+	if version != FORMAT_VERSION:
+		raise ValueError(f"{file.name} has unsupported format version {version}")
+
+
+def read_samples(path: str):
+	""" Yields (timestamp, sensor_id, digits, value) for every record in a file"""
+	with open(path, "rb") as file:
+		check_header(file)
+		data = file.read()
+	# Ignore a partial record left by an interrupted write
+	usable = len(data) - len(data) % RECORD.size
+	yield from RECORD.iter_unpack(memoryview(data)[:usable])
+
+
+def format_line(record: tuple, user: str) -> str:
+	""" Renders one record as a text log line (without the newline)
+
+	:param record:	(timestamp, sensor_id, digits, value) as read_samples yields
+	:param user:	User name for the user column
+	"""
+	timestamp, sensor_id, digits, value = record
+	# Round to whole milliseconds first so ,815 does not come back as ,814
+	millis = round(timestamp * 1000)
+	asctime = datetime.fromtimestamp(millis // 1000).strftime("%Y-%m-%d %H:%M:%S") \
+		+ f",{millis % 1000:03d}"
+	if sensor_id == PROXIMITY_WARNING:
+		message = (
+			"Something is near the sensor. "
+			f"Prox: {value}. "
+			"Please remove to continue."
+			)
+	elif sensor_id == RESUMED:
+		message = "Resuming data collection"
+	elif sensor_id == PMS_READ_ERROR:
+		message = "pms5003 read error"
+	elif sensor_id == RAW_FLOAT:
+		# Older logs printed the exact Decimal of the reading
+		reading, = FLOAT_BITS.unpack(INT_BITS.pack(value))
+		message = str(Decimal(reading))
+	else:
+		message = str(value).zfill(digits)
+	return TEXT_FORMAT.format(asctime=asctime, user=user, message=message)
+
+
+def parse_line(line: str) -> tuple:
+	""" Turns a text log line into a record, None if it has no record form"""
+	match = TEXT_LINE.match(line)
+	if match is None:
+		return None
+	date, millis, _user, message = match.groups()
+	timestamp = datetime.strptime(date, "%Y-%m-%d %H:%M:%S").timestamp() \
+		+ int(millis) / 1000
+	prox = PROXIMITY_MESSAGE.match(message)
+	if message.isdigit() and len(message) <= 18: # Always fits in int64
+		return (timestamp, UNKNOWN_SENSOR, len(message), int(message))
+	elif FLOAT_MESSAGE.match(message):
+		bits, = INT_BITS.unpack(FLOAT_BITS.pack(float(message)))
+		return (timestamp, RAW_FLOAT, 0, bits)
+	elif prox is not None:
+		return (timestamp, PROXIMITY_WARNING, 0, int(prox.group(1)))
+	elif message == "Resuming data collection":
+		return (timestamp, RESUMED, 0, 0)
+	elif message == "pms5003 read error":
+		return (timestamp, PMS_READ_ERROR, 0, 0)
+	return None
+
+
+def text_to_binary(text_path: str, binary_path: str, user: str="pi4b") -> tuple:
+	""" Converts an existing text noise log to the binary format
+
+	Integer messages become UNKNOWN_SENSOR records, the raw float
+	readings of older logs become RAW_FLOAT records, and proximity
+	warnings, resume and pms5003 messages become event records.
+
+	A line goes to the binary file only if format_line gives it back
+	exactly with this user. Every other line (older warning wordings,
+	another user, ...) is kept as is in the sidecar file
+	binary_path + SKIPPED_SUFFIX, together with its position, so
+	binary_to_text can put it back. Both files are overwritten.
+
+	:return:	(records written, lines skipped)
+	"""
+	written = skipped = 0
+	skipped_path = binary_path + SKIPPED_SUFFIX
+	if os.path.exists(skipped_path):
+		os.remove(skipped_path) # Left over from an earlier conversion
+	with open(text_path, "r", newline="") as text, open(binary_path, "wb") as binary:
+		batch = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION))
+		skipped_lines = []
+		for line in text:
+			line = line.rstrip("\n")
+			record = parse_line(line)
+			if record is None or format_line(record, user) != line:
+				# Position is the number of records before this line
+				skipped_lines.append(f"{written}\t{line}\n")
+				skipped += 1
+				continue
+			batch += RECORD.pack(*record)
+			written += 1
+		binary.write(batch)
+	if skipped_lines:
+		with open(skipped_path, "w", newline="") as sidecar:
+			sidecar.writelines(skipped_lines)
+	return written, skipped
+
+
+def binary_to_text(binary_path: str, text_path: str, user: str="pi4b") -> int:
+	""" Converts a binary sample file back to the text log format
+
+	Lines kept in the sidecar file by text_to_binary are put back in
+	their original place, so a log converted with the same user comes
+	back byte for byte.
+
+	:return:	Lines written
+	"""
+	skipped_lines = []
+	skipped_path = binary_path + SKIPPED_SUFFIX
+	if os.path.exists(skipped_path):
+		with open(skipped_path, "r", newline="") as sidecar:
+			for entry in sidecar:
+				position, line = entry.rstrip("\n").split("\t", 1)
+				skipped_lines.append((int(position), line))
+	skipped_lines.reverse() # Pop from the end in file order
+
+	count = 0
+	with open(text_path, "w", newline="") as text:
+		for position, record in enumerate(read_samples(binary_path)):
+			while skipped_lines and skipped_lines[-1][0] == position:
+				text.write(skipped_lines.pop()[1] + "\n")
+				count += 1
+			text.write(format_line(record, user) + "\n")
+			count += 1
+		for _position, line in reversed(skipped_lines): # After the last record
+			text.write(line + "\n")
+			count += 1
+	return count
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Convert noise logs between text and binary")
+	parser.add_argument("direction", choices=["to-binary", "to-text"])
+	parser.add_argument("source")
+	parser.add_argument("destination")
+	parser.add_argument("--user", default="pi4b", help="User name in the text log's user column")
+	args = parser.parse_args()
+
+	if args.direction == "to-binary":
+		written, skipped = text_to_binary(args.source, args.destination, args.user)
+		print(f"Wrote {written} records")
+		if skipped:
+			print(
+				f"{skipped} lines have no exact record form, kept them in "
+				f"{args.destination + SKIPPED_SUFFIX}. Keep it next to "
+				f"{args.destination} or to-text cannot restore them."
+				)
+	else:
+		count = binary_to_text(args.source, args.destination, args.user)
+		print(f"Wrote {count} lines")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,137 @@
+import os
+import time
+import struct
+
+import pytest
+
+from sample_store import (
+	SampleWriter,
+	read_samples,
+	text_to_binary,
+	binary_to_text,
+	HEADER,
+	RECORD,
+	MAGIC,
+	FORMAT_VERSION,
+	SKIPPED_SUFFIX,
+	)
+
+
+LOG = (
+	"2024-08-22 18:00:23,815 pi4b     704599502044970\n"
+	"2024-08-22 18:00:24,821 pi4b     082025310599078\n"
+	"2024-07-27 20:53:03,321 pi4b     22.46677045995020449709045351482927799224853515625\n"
+	"2024-08-22 18:00:25,828 pi4b     Something is near the sensor. Prox: 4. Please remove to continue.\n"
+	"2024-07-28 16:10:11,158 pi4b     Something is near the sensor. Prox: 30Please remove to continue.\n"
+	"2024-08-22 18:00:30,834 pi4b     Resuming data collection\n"
+	"2024-08-22 18:00:31,840 pi4b     pms5003 read error\n"
+	"2024-08-22 18:00:32,846 pi4b     0\n"
+	"2024-08-22 18:00:33,852 pi4b     Something is near the sensor. Please remove to continue.\n"
+	)
+
+
+def wait_for_size(path, size, timeout=2.0):
+	""" Polls until the worker has written the file up to size bytes"""
+	deadline = time.monotonic() + timeout
+	while os.path.getsize(path) < size and time.monotonic() < deadline:
+		time.sleep(.01)
+	return os.path.getsize(path)
+
+
+def test_round_trip_text_log(tmp_path):
+	text_path, binary_path, out_path = (str(tmp_path / name) for name in ("log", "bin", "out"))
+	with open(text_path, "w") as file:
+		file.write(LOG)
+
+	written, skipped = text_to_binary(text_path, binary_path)
+	assert (written, skipped) == (7, 2)
+	assert os.path.exists(binary_path + SKIPPED_SUFFIX)
+	assert binary_to_text(binary_path, out_path) == 9
+	with open(out_path) as file:
+		assert file.read() == LOG
+
+	# Converting again overwrites instead of appending
+	assert text_to_binary(text_path, binary_path) == (7, 2)
+	assert len(list(read_samples(binary_path))) == 7
+
+
+def test_writer_appends_to_existing_file(tmp_path):
+	path = str(tmp_path / "bin")
+	with SampleWriter(path) as samples:
+		samples.write(0, 7)
+	with SampleWriter(path) as samples:
+		samples.write(1, 42, digits=3)
+	assert [record[1:] for record in read_samples(path)] == [(0, 0, 7), (1, 3, 42)]
+
+
+def test_writer_drops_partial_record(tmp_path):
+	path = str(tmp_path / "bin")
+	with SampleWriter(path) as samples:
+		samples.write(0, 7)
+	with open(path, "ab") as file:
+		file.write(b"xyz") # Interrupted write
+	with SampleWriter(path) as samples:
+		samples.write(1, 42)
+	assert [record[1:] for record in read_samples(path)] == [(0, 0, 7), (1, 0, 42)]
+	assert os.path.getsize(path) == HEADER.size + 2 * RECORD.size
+
+
+@pytest.mark.parametrize("header", [b"garbage!", HEADER.pack(MAGIC, FORMAT_VERSION + 1)])
+def test_wrong_header_is_rejected(tmp_path, header):
+	path = str(tmp_path / "bin")
+	with open(path, "wb") as file:
+		file.write(header)
+	with pytest.raises(ValueError):
+		SampleWriter(path)
+	with pytest.raises(ValueError):
+		list(read_samples(path))
+	with open(path, "rb") as file:
+		assert file.read() == header # Left untouched
+
+
+def test_writer_flushes_full_batch(tmp_path):
+	path = str(tmp_path / "bin")
+	with SampleWriter(path, batch_size=2, flush_interval=60) as samples:
+		samples.write(0, 1)
+		samples.write(0, 2)
+		assert wait_for_size(path, HEADER.size + 2 * RECORD.size) == HEADER.size + 2 * RECORD.size
+		samples.write(0, 3)
+		time.sleep(.1)
+		assert os.path.getsize(path) == HEADER.size + 2 * RECORD.size # Still batching
+	assert os.path.getsize(path) == HEADER.size + 3 * RECORD.size
+
+
+def test_writer_flushes_after_interval(tmp_path):
+	path = str(tmp_path / "bin")
+	with SampleWriter(path, batch_size=256, flush_interval=.05) as samples:
+		samples.write(0, 1)
+		assert wait_for_size(path, HEADER.size + RECORD.size) == HEADER.size + RECORD.size
+
+
+def test_write_rejects_bad_values(tmp_path):
+	with SampleWriter(str(tmp_path / "bin")) as samples:
+		with pytest.raises(struct.error):
+			samples.write(0, 2**70)
+		with pytest.raises(struct.error):
+			samples.write(0, 1.5)
+
+
+def test_exit_keeps_active_exception(tmp_path):
+	path = str(tmp_path / "bin")
+	with pytest.raises(KeyboardInterrupt):
+		with SampleWriter(path, flush_interval=.01) as samples:
+			samples._SampleWriter__file.close() # Make the worker fail
+			samples.write(0, 1)
+			time.sleep(.1)
+			raise KeyboardInterrupt
+
+
+def test_worker_error_is_raised(tmp_path):
+	samples = SampleWriter(str(tmp_path / "bin"), flush_interval=.01)
+	samples._SampleWriter__file.close() # Make the worker fail
+	samples.write(0, 1)
+	time.sleep(.1)
+	with pytest.raises(ValueError):
+		samples.write(0, 2)
+	with pytest.raises(ValueError):
+		samples.close()